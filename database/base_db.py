@@ -1,40 +1,154 @@
 # database/base_db.py
 import sqlite3
 import logging
+import configparser
+import functools
+import threading
+import weakref
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = Path(__file__).parent.parent / 'config.ini'
+
+# Connection-level tuning applied once per connection: WAL turns each commit into
+# a single log append, and the larger page cache / mmap keeps B-tree pages hot.
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Read-only connections cannot change the journal mode; WAL is a persistent
+# property of the database file, set by the first writer connection.
+READ_ONLY_PRAGMAS = """
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+@functools.lru_cache(maxsize=1)
+def _load_repopulate_flag():
+    """
+    Reads the REPOPULATE_DB flag from config.ini. The result is cached so the
+    file is parsed at most once per process.
+
+    Returns:
+        bool: True if repopulation is configured, False otherwise.
+    """
+    config = configparser.ConfigParser()
+
+    if not CONFIG_PATH.exists():
+        logger.warning(f"Configuration file not found at {CONFIG_PATH}. Defaulting to no repopulation.")
+        return False
+
+    try:
+        config.read(CONFIG_PATH)
+        # Ensure DATABASE section and REPOPULATE_DB key exist
+        if 'DATABASE' in config and 'REPOPULATE_DB' in config['DATABASE']:
+            repopulate = config.getboolean('DATABASE', 'REPOPULATE_DB', fallback=False)
+            logger.info(f"Repopulate flag read from config: {repopulate}")
+            return repopulate
+        else:
+            logger.warning("'DATABASE' section or 'REPOPULATE_DB' key not found in config.ini. Defaulting to no repopulation.")
+            return False
+    except configparser.Error as e:
+        logger.error(f"Error reading configuration file {CONFIG_PATH}: {e}")
+        return False
+    except ValueError as e:
+        logger.error(f"Error parsing REPOPULATE_DB value in {CONFIG_PATH}: {e}. Should be True/False.")
+        return False
+
+def with_lock(method):
+    """
+    Decorator that runs a database method while holding the instance's
+    ``lock``, serializing access to a connection shared across threads.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class BaseDatabase:
     """
     Base class for database interactions, handling connection 
     and configuration checks.
     """
-    def __init__(self, db_name="tasks.db"):
+    def __init__(self, db_name="tasks.db", read_only=False):
         """
         Initializes the BaseDatabase with a specified database name.
 
         Args:
             db_name (str): The name of the database file.
+            read_only (bool): Open the file with mode=ro. Under WAL a reader
+                              connection never blocks, or is blocked by, the writer.
         """
         self.logger = logging.getLogger(self.__class__.__name__) # Use specific class name
         self.db_name = db_name
+        self.read_only = read_only
         self.conn = None
+        self.lock = threading.RLock()
+        self._pragmas_applied = False
+        self._finalizer = None
         self.logger.info(f"BaseDatabase initialized for {db_name}")
 
     def connect(self):
         # throw exception if connection failed, caller must handle failure explicitly
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_name, check_same_thread=True) # TODO check thread
+            # One connection per BaseDatabase, which the app builds afresh on
+            # each script run; the finalizer below closes it once that object
+            # is dropped. check_same_thread=False because the drop (and so the
+            # close) may happen on a different thread than the one that
+            # opened it. Handlers sharing the connection serialize on
+            # self.lock (see with_lock).
+            if self.read_only:
+                database, uri = f"{Path(self.db_name).resolve().as_uri()}?mode=ro", True
+            else:
+                database, uri = self.db_name, False
+            self.conn = sqlite3.connect(database, uri=uri, check_same_thread=False)
+            self._apply_pragmas()
+            # Close the connection when this object is collected, without relying
+            # on __del__ (which may run during interpreter shutdown).
+            self._finalizer = weakref.finalize(self, self.conn.close)
             self.logger.info(f"Database connection established to {self.db_name}")
-            return self.conn
+        return self.conn
 
+    def _apply_pragmas(self):
+        """Applies the connection PRAGMAs, skipping them if already applied."""
+        if self._pragmas_applied:
+            return
+        # WAL and mmap only apply to file-backed databases; an in-memory
+        # database reports an empty file name for "main".
+        if not self.conn.execute("PRAGMA database_list").fetchone()[2]:
+            self.logger.info(f"Skipping connection PRAGMAs for in-memory database {self.db_name}")
+            self._pragmas_applied = True
+            return
+        self.conn.executescript(READ_ONLY_PRAGMAS if self.read_only else CONNECTION_PRAGMAS)
+        self._pragmas_applied = True
+        self.logger.info(f"Connection PRAGMAs applied for {self.db_name}")
 
     def close(self):
         """Closes the database connection if it is open."""
         if self.conn:
-            self.conn.close()
+            self._finalizer()
+            self._finalizer = None
             self.conn = None
+            self._pragmas_applied = False
             self.logger.info(f"Database connection closed for {self.db_name}")
 
+    def _should_repopulate(self):
+        """
+        Checks configuration file (config.ini) to determine if the 
+        database should be repopulated on initialization.
+        
+        Returns:
+            bool: True if repopulation is configured, False otherwise.
+        """
+        return _load_repopulate_flag()
+
     def get_connection(self):
         """
         Returns the active database connection, establishing it if necessary.
@@ -45,6 +159,12 @@ class BaseDatabase:
             return self.connect()
         return self.conn
 
-    # def __del__(self):
-    #     """Ensures the database connection is closed when the object is destroyed."""
-    #     self.close()
\ No newline at end of file
+    def __enter__(self):
+        """Opens the connection for use in a ``with`` block."""
+        self.get_connection()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the connection when leaving a ``with`` block."""
+        self.close()
+        return False
@@ -1,8 +1,5 @@
 # database/rag_db.py
 import logging
-import configparser
-from pathlib import Path
-import sqlite3
 from .base_db import BaseDatabase
 from .rag_task_db import TaskDatabase
 from .rag_user_db import UserDatabase
@@ -14,13 +11,9 @@ class DatabaseHelper:
     """
     def __init__(self, db_name="tasks.db"):
         """
-        Initializes the RAGDatabase with a specified database name.
+        Initializes the DatabaseHelper with a specified database name.
         """
-        # super().__init__(db_name)  # Initialize BaseDatabase
         self.base_db = BaseDatabase(db_name)
-        # self.conn = self.base_db.connect()
-        # self.task_db = None
-        # self.user_db = None
         self.logger = logging.getLogger(__name__)
 
     def initialize_db(self):
@@ -33,60 +26,23 @@ class DatabaseHelper:
         
         # Create new connection
         self.conn = self.base_db.connect()
+        self.lock = self.base_db.lock
         
-        # Create specialized database handlers with shared connection
-        task_db = TaskDatabase(self.conn)
-        user_db = UserDatabase(self.conn)
+        # Create specialized database handlers with shared connection and lock
+        task_db = TaskDatabase(self.conn, self.lock)
+        user_db = UserDatabase(self.conn, self.lock)
         
         # Initialize tables
         task_db.initialize_tables()
         user_db.initialize_tables()
         
         # Check if repopulation is needed (using base method)
-        if self._should_repopulate():
-            self.logger.info("Repopulation flag is set. Truncating and populating data.")
+        if self.base_db._should_repopulate():
+            self.logger.info("Repopulation flag is set. Replacing data from JSON files.")
             
-            # Truncate all tables
-            task_db.truncate_tables()
-            user_db.truncate_tables()
-            
-            # Populate from JSON files
-            task_db.populate_from_json("todo.rag.test_data.json")
-            user_db.populate_from_json("users.json")
+            # Replace table contents from JSON files; each table's delete and
+            # insert run in one write transaction
+            task_db.populate_from_json("todo.rag.test_data.json", replace=True)
+            user_db.populate_from_json("users.json", replace=True)
             
             self.logger.info("Database repopulation complete.")
-        
-        # Done database initialization
-        # self.base_db.close()
-        
-    def _should_repopulate(self):
-        """
-        Checks configuration file (config.ini) to determine if the 
-        database should be repopulated on initialization.
-        
-        Returns:
-            bool: True if repopulation is configured, False otherwise.
-        """
-        config = configparser.ConfigParser()
-        config_path = Path(__file__).parent.parent / 'config.ini' 
-        
-        if not config_path.exists():
-            self.logger.warning(f"Configuration file not found at {config_path}. Defaulting to no repopulation.")
-            return False
-        
-        try:
-            config.read(config_path)
-            # Ensure DATABASE section and REPOPULATE_DB key exist
-            if 'DATABASE' in config and 'REPOPULATE_DB' in config['DATABASE']:
-                 repopulate = config.getboolean('DATABASE', 'REPOPULATE_DB', fallback=False)
-                 self.logger.info(f"Repopulate flag read from config: {repopulate}")
-                 return repopulate
-            else:
-                 self.logger.warning("'DATABASE' section or 'REPOPULATE_DB' key not found in config.ini. Defaulting to no repopulation.")
-                 return False
-        except configparser.Error as e:
-            self.logger.error(f"Error reading configuration file {config_path}: {e}")
-            return False
-        except ValueError as e:
-             self.logger.error(f"Error parsing REPOPULATE_DB value in {config_path}: {e}. Should be True/False.")
-             return False
\ No newline at end of file
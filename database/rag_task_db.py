@@ -1,103 +1,229 @@
 import sqlite3
 import json
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
+from .base_db import with_lock
+
+# SQL statements are kept as module constants so each one is written, and
+# reviewed, in a single place.
+# Whole schema bootstrap, run in one executescript call and one transaction.
+# task_tags holds normalized task/tag pairs so tag lookups can use an index
+# instead of scanning the comma-joined tags column.
+_SQL_SCHEMA = """
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        description TEXT,
+        tags TEXT,
+        timestamp TEXT
+    );
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 1
+    );
+    INSERT OR IGNORE INTO cache_versions (id, version)
+    VALUES (1, 1);
+    CREATE TABLE IF NOT EXISTS task_tags (
+        task_id INTEGER NOT NULL,
+        tag TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag);
+    CREATE INDEX IF NOT EXISTS idx_task_tags_task_id ON task_tags(task_id);
+    COMMIT;
+"""
+# Secondary indexes dropped during a replacing bulk load and rebuilt afterwards
+# in one sorted pass, instead of being maintained row by row.
+_SQL_DROP_TASK_TAG_INDEXES = (
+    "DROP INDEX IF EXISTS idx_task_tags_tag",
+    "DROP INDEX IF EXISTS idx_task_tags_task_id",
+)
+_SQL_CREATE_TASK_TAG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag)",
+    "CREATE INDEX IF NOT EXISTS idx_task_tags_task_id ON task_tags(task_id)",
+)
+# Takes the write lock up front so a bulk load cannot fail midway on a busy database.
+_SQL_BEGIN_IMMEDIATE = "BEGIN IMMEDIATE"
+_SQL_SELECT_CACHE_VERSION = "SELECT version FROM cache_versions WHERE id = 1"
+_SQL_INCREMENT_CACHE_VERSION = """
+    UPDATE cache_versions 
+    SET version = version + 1 
+    WHERE id = 1
+"""
+_SQL_RESET_CACHE_VERSION = """
+    UPDATE cache_versions 
+    SET version = 0 
+    WHERE id = 1
+"""
+_SQL_INSERT_TASK = """
+    INSERT INTO tasks (title, description, tags, timestamp)
+    VALUES (?, ?, ?, ?)
+"""
+_SQL_INSERT_TASK_RETURNING_ID = """
+    INSERT INTO tasks (title, description, tags, timestamp)
+    VALUES (?, ?, ?, ?)
+    RETURNING id
+"""
+# Only matches when a value actually differs, so a no-op save changes no
+# rows and does not bump the cache version.
+_SQL_UPDATE_TASK = """
+    UPDATE tasks 
+    SET title = :title, 
+        description = :description, 
+        tags = :tags,
+        timestamp = :timestamp
+    WHERE id = :id
+      AND (title IS NOT :title
+           OR description IS NOT :description
+           OR tags IS NOT :tags
+           OR timestamp IS NOT :timestamp)
+"""
+_SQL_SELECT_ALL_TASKS = "SELECT id, title, description, tags, timestamp FROM tasks"
+_SQL_SELECT_TASK_BY_ID = "SELECT id, title, description, tags, timestamp FROM tasks WHERE id = :id"
+_SQL_SELECT_TASKS_BY_TAG = """
+    SELECT t.id, t.title, t.description, t.tags, t.timestamp
+    FROM tasks t
+    JOIN task_tags tt ON tt.task_id = t.id
+    WHERE tt.tag = :tag
+"""
+_SQL_SELECT_UNTAGGED_TASKS = """
+    SELECT id, tags FROM tasks
+    WHERE id NOT IN (SELECT task_id FROM task_tags)
+"""
+_SQL_DELETE_ALL_TASKS = "DELETE FROM tasks"
+_SQL_DELETE_ALL_TASK_TAGS = "DELETE FROM task_tags"
+_SQL_INSERT_TASK_TAG = "INSERT INTO task_tags (task_id, tag) VALUES (?, ?)"
+_SQL_DELETE_TASK_TAGS = "DELETE FROM task_tags WHERE task_id = ?"
+
+def _pack_tags(tags):
+    """Returns tags in the comma-joined column format, skipping the join if already a string."""
+    return tags if isinstance(tags, str) else ','.join(tags)
 
 class TaskDatabase:
     """
     Manages task-related database operations.
     """
-    def __init__(self, conn):
+    def __init__(self, conn, lock=None):
         """
         Initializes the TaskDatabase with a database connection.
 
         Args:
             conn: SQLite database connection
+            lock: Lock shared by all handlers using conn. A private lock is
+                  created if omitted.
         """
         self.logger = logging.getLogger(__name__)
         self.conn = conn
+        self.lock = lock or threading.RLock()
+        # Rows support name-based access directly from C; converted to dicts
+        # only at the API boundary.
+        self.conn.row_factory = sqlite3.Row
+        self._cursor = None
 
+    @with_lock
     def initialize_tables(self):
         """
-        Creates the tasks and cache_versions tables if they don't exist.
+        Creates the tasks, cache_versions and task_tags tables if they don't exist.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            description TEXT,
-            tags TEXT,
-            timestamp TEXT
-        )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cache_versions (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                version INTEGER NOT NULL DEFAULT 1
-            )
-        """)
-        cursor.execute("""
-            INSERT OR IGNORE INTO cache_versions (id, version)
-            VALUES (1, 1)
-        """)
+        self.conn.executescript(_SQL_SCHEMA)
+        cursor = self._get_cursor()
+        self._backfill_task_tags(cursor)
         self.conn.commit()
         self.logger.info("Task tables initialized.")
 
+    def _get_cursor(self):
+        """
+        Returns the cursor reused by the single-statement methods, creating it
+        on first use. Generators such as iter_all_tasks use their own cursor.
+        """
+        if self._cursor is None:
+            self._cursor = self.conn.cursor()
+        return self._cursor
+
+    @staticmethod
+    def _split_tags(tags):
+        """
+        Returns tags as a de-duplicated list, accepting either a list or a
+        comma-separated string. Duplicates are dropped so the task_tags join
+        never returns the same task twice for one tag.
+        """
+        if isinstance(tags, str):
+            tags = tags.split(',')
+        return list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+
+    def _insert_task_tags(self, cursor, task_id, tags):
+        """Inserts the task_tags rows for a single task."""
+        cursor.executemany(
+            _SQL_INSERT_TASK_TAG,
+            [(task_id, tag) for tag in self._split_tags(tags)]
+        )
+
+    def _backfill_task_tags(self, cursor):
+        """
+        Fills task_tags for tasks that have no tag rows yet, e.g. rows written
+        before the task_tags table existed or inserted in bulk.
+        """
+        cursor.execute(_SQL_SELECT_UNTAGGED_TASKS)
+        rows = [(task_id, tag) for task_id, tags in cursor.fetchall()
+                for tag in self._split_tags(tags or '')]
+        if rows:
+            cursor.executemany(_SQL_INSERT_TASK_TAG, rows)
+            self.logger.info(f"Backfilled {len(rows)} task tags.")
+
+    @with_lock
     def get_cache_version(self):
         """Retrieve current cache version from DB"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT version FROM cache_versions WHERE id = 1")
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_SELECT_CACHE_VERSION)
         return cursor.fetchone()[0]
 
     def _increment_cache_version(self):
-        """Atomically increment cache version"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE cache_versions 
-            SET version = version + 1 
-            WHERE id = 1
-        """)
+        """
+        Atomically increment cache version. Runs inside the caller's
+        transaction; the caller commits.
+        """
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_INCREMENT_CACHE_VERSION)
         self.logger.info("Incrementing cache version");
-        self.conn.commit()
         return cursor.rowcount > 0
 
+    @with_lock
     def reset_cache_version(self):
         """Reset cache version"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE cache_versions 
-            SET version = 0 
-            WHERE id = 1
-        """)
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_RESET_CACHE_VERSION)
         self.logger.info("Cache version reset to 0")
         self.conn.commit()
         return cursor.rowcount > 0
 
     def version_aware(original_method):
-        """Decorator for version-controlled write operations"""
+        """
+        Decorator for version-controlled write operations. The write and the
+        version bump share one transaction, committed once on success and
+        rolled back on error. A sqlite3.Error from the write is logged after
+        the rollback and reported as None.
+        """
         def wrapper(self, *args, **kwargs):
             try:
-                # Start transaction
-                self.conn.execute("BEGIN")
-                
-                # Execute original method
-                result = original_method(self, *args, **kwargs)
-                
-                # Only increment version if operation succeeded
-                if result is not None and result is not False:
-                    self._increment_cache_version()
-                
-                self.conn.commit()
+                with self.conn:
+                    # Execute original method
+                    result = original_method(self, *args, **kwargs)
+
+                    # Only increment version if operation succeeded
+                    if result is not None and result is not False:
+                        self._increment_cache_version()
                 return result
+            except sqlite3.Error as e:
+                self.logger.error(f"Error in {original_method.__name__}: {e}")
+                return None
             except Exception as e:
-                self.conn.rollback()
                 self.logger.error(f"Versioned operation failed: {e}")
                 raise
         return wrapper
 
+    @with_lock
     @version_aware
     def add_task(self, task):
         """
@@ -107,18 +233,37 @@ class TaskDatabase:
             task (dict): A dictionary representing the task with 'title', 'description',
                          'tags' (list of strings), and 'timestamp' (ISO 8601 format) keys.
         """
+        cursor = self._get_cursor()
+        # RETURNING hands back the id with the insert itself rather than
+        # relying on the connection-wide lastrowid.
+        cursor.execute(_SQL_INSERT_TASK_RETURNING_ID, (task['title'], task['description'], _pack_tags(task['tags']), task['timestamp']))
+        task_id = cursor.fetchone()[0]
+        self._insert_task_tags(cursor, task_id, task['tags'])
+        # Return the inserted row ID
+        return task_id
+
+    def iter_tasks(self):
+        """
+        Streams all tasks as sqlite3.Row objects, for callers that only read
+        fields while iterating and don't need a dict per task.
+
+        Yields:
+            sqlite3.Row: A row supporting task['title'] style access.
+        """
         cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO tasks (title, description, tags, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (task['title'], task['description'], ','.join(task['tags']), task['timestamp']))
-            self.conn.commit()
-            # Return the inserted row ID
-            return cursor.lastrowid
-        except sqlite3.Error as e:
-            self.logger.error(f"Error adding task: {e}")
-            return None
+        cursor.arraysize = 256
+        cursor.execute(_SQL_SELECT_ALL_TASKS)
+        yield from cursor
+
+    def iter_all_tasks(self):
+        """
+        Streams all tasks from the database without materializing the result set.
+
+        Yields:
+            dict: A dictionary representing a task.
+        """
+        for row in self.iter_tasks():
+            yield dict(row)
 
     def get_all_tasks(self):
         """
@@ -127,28 +272,44 @@ class TaskDatabase:
         Returns:
             list: A list of dictionaries, where each dictionary represents a task.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT title, description, tags, timestamp, id FROM tasks")
-        rows = cursor.fetchall()
-        logging.info(f"Retrieved {len(rows)} tasks from the database")
-        return [{'title': row[0], 'description': row[1], 'tags': row[2], 'timestamp': row[3], 'id': row[4]} for row in rows]
+        tasks = list(self.iter_all_tasks())
+        logging.info(f"Retrieved {len(tasks)} tasks from the database")
+        return tasks
+
+    @with_lock
+    def get_task_by_id(self, task_id):
+        """
+        Retrieves a single task by its primary key.
+
+        Args:
+            task_id (int): The ID of the task.
+
+        Returns:
+            dict or None: The task, or None if no task has that ID.
+        """
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_SELECT_TASK_BY_ID, {'id': task_id})
+        row = cursor.fetchone()
+        return dict(row) if row is not None else None
 
+    @with_lock
     def get_tasks_by_tags(self, tag):
         """
         Retrieves tasks filtered by a specific tag.
 
         Args:
-            tag (str): The tag to filter tasks by.
+            tag (str): The tag to filter tasks by (exact match).
 
         Returns:
             list: A list of dictionaries, where each dictionary represents a task matching the tag.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT title, description, tags, timestamp, id FROM tasks WHERE tags LIKE ?", ('%' + tag + '%',))
-        rows = cursor.fetchall()
-        logging.info(f"Retrieved {len(rows)} tasks by tags from the database")
-        return [{'title': row[0], 'description': row[1], 'tags': row[2], 'timestamp': row[3], 'id': row[4]} for row in rows]
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_SELECT_TASKS_BY_TAG, {'tag': tag})
+        tasks = [dict(row) for row in cursor]
+        logging.info(f"Retrieved {len(tasks)} tasks by tags from the database")
+        return tasks
 
+    @with_lock
     @version_aware
     def update_task(self, task_id, task):
         """
@@ -160,62 +321,110 @@ class TaskDatabase:
                         'title', 'description', 'tags', and 'timestamp' keys
 
         Returns:
-            bool: True if update was successful, False if task not found
+            dict, bool or None: The updated task, False if the task was not found
+                                or none of its values changed (the cache version
+                                is then left untouched), or None on a database
+                                error (the update is rolled back)
         """
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE tasks 
-                SET title = ?, 
-                    description = ?, 
-                    tags = ?,
-                    timestamp = ?
-                WHERE id = ?
-            """, (
-                task['title'],
-                task['description'],
-                ','.join(task['tags']),
-                task['timestamp'],
-                task_id
-            ))
-            self.conn.commit()
-            
-            if cursor.rowcount > 0:
-                # Return full task object with updated values
-                return {
-                    'id': task_id,
-                    'title': task['title'],
-                    'description': task['description'],
-                    'tags': task['tags'],
-                    'timestamp': task['timestamp']
-                }
-            return False
-        except sqlite3.Error as e:
-            self.logger.error(f"Error updating task: {e}")
-            return False
+        cursor = self._get_cursor()
+        cursor.execute(_SQL_UPDATE_TASK, {
+            'title': task['title'],
+            'description': task['description'],
+            'tags': _pack_tags(task['tags']),
+            'timestamp': task['timestamp'],
+            'id': task_id
+        })
+        if cursor.rowcount > 0:
+            cursor.execute(_SQL_DELETE_TASK_TAGS, (task_id,))
+            self._insert_task_tags(cursor, task_id, task['tags'])
+            # Return full task object with updated values
+            return {
+                'id': task_id,
+                'title': task['title'],
+                'description': task['description'],
+                'tags': task['tags'],
+                'timestamp': task['timestamp']
+            }
+        return False
 
+    @with_lock
     def truncate_tables(self):
         """
         Truncates the tasks table.
         """
         cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM tasks")
+        cursor.execute(_SQL_DELETE_ALL_TASKS)
+        cursor.execute(_SQL_DELETE_ALL_TASK_TAGS)
         self.conn.commit()
 
-    def populate_from_json(self, file_path):
+    @with_lock
+    def bulk_add_tasks(self, tasks, replace=False):
+        """
+        Adds many tasks in a single write transaction.
+
+        Rows are inserted with one executemany, their task_tags rows are
+        filled in afterwards, and the cache version is bumped once for the
+        whole batch. With replace=True the existing tasks are deleted inside
+        the same transaction, so readers never see an empty table, and the
+        task_tags indexes are rebuilt once after the load.
+
+        Args:
+            tasks (iterable): Task dictionaries in the same format as add_task.
+                              Any iterable works; rows are streamed into
+                              executemany without building an intermediate list.
+            replace (bool): Delete all existing tasks before inserting.
+
+        Returns:
+            int: The number of tasks inserted.
+        """
+        rows = (
+            (task['title'], task['description'], _pack_tags(task['tags']), task['timestamp'])
+            for task in tasks
+        )
+        cursor = self._get_cursor()
+        try:
+            cursor.execute(_SQL_BEGIN_IMMEDIATE)
+            if replace:
+                cursor.execute(_SQL_DELETE_ALL_TASKS)
+                cursor.execute(_SQL_DELETE_ALL_TASK_TAGS)
+                for statement in _SQL_DROP_TASK_TAG_INDEXES:
+                    cursor.execute(statement)
+            cursor.executemany(_SQL_INSERT_TASK, rows)
+            count = cursor.rowcount
+            self._backfill_task_tags(cursor)
+            if replace:
+                for statement in _SQL_CREATE_TASK_TAG_INDEXES:
+                    cursor.execute(statement)
+            self._increment_cache_version()
+            self.conn.commit()
+        except Exception:
+            # Also covers a malformed task dict raising from the row generator,
+            # which would otherwise leave the DELETEs and dropped indexes open.
+            self.conn.rollback()
+            raise
+        return count
+
+    def populate_from_json(self, file_path, replace=False):
         """
         Populates the tasks table from a JSON file.
 
         Args:
             file_path (str): Path to the JSON file containing task data
+            replace (bool): Replace existing tasks within the same transaction.
         """
         self.logger.info("Populating tasks from JSON file: %s", file_path)
         try:
             with open(file_path, 'r') as f:
                 data = json.load(f)
-                for task in data:
-                    self.add_task(task)
         except FileNotFoundError:
             self.logger.error(f"JSON file not found at {file_path}")
+            return
         except json.JSONDecodeError:
             self.logger.error(f"Invalid JSON format in {file_path}")
+            return
+
+        try:
+            count = self.bulk_add_tasks(data, replace=replace)
+            self.logger.info(f"Populated {count} tasks.")
+        except sqlite3.Error as e:
+            self.logger.error(f"Error populating tasks from {file_path}: {e}")
@@ -1,39 +1,85 @@
+import os
 import sqlite3
+import functools
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import bcrypt
+from .base_db import with_lock
 from streamlit_authenticator.utilities.hasher import Hasher
 
+# Optional bcrypt cost for seeding users from JSON (e.g. 4 for local dev
+# fixtures). Unset keeps the authenticator's default cost.
+SEED_BCRYPT_ROUNDS_ENV = "SEED_BCRYPT_ROUNDS"
+
+_SQL_SCHEMA = """
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        email TEXT,
+        name TEXT,
+        hashed_password TEXT
+    );
+    COMMIT;
+"""
+_SQL_INSERT_USER_OR_IGNORE = """
+    INSERT OR IGNORE INTO users (username, email, name, hashed_password)
+    VALUES (?, ?, ?, ?)
+"""
+_SQL_SELECT_CREDENTIALS = "SELECT username, email, name, hashed_password AS password FROM users"
+_SQL_DELETE_USERS = "DELETE FROM users"
+
+def _hash_password(password, rounds=None):
+    """
+    Hashes a password with bcrypt. With rounds=None the authenticator's own
+    Hasher (default cost) is used; otherwise bcrypt runs at the given cost.
+    Either form is verified by Streamlit Authenticator's bcrypt check.
+    """
+    if rounds is None:
+        return Hasher.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+def _hash_passwords(passwords, rounds=None):
+    """
+    Hashes passwords concurrently, preserving input order. bcrypt releases
+    the GIL while hashing, so a thread pool runs the hashes in parallel
+    without spawning processes from inside the Streamlit server.
+    """
+    hash_password = functools.partial(_hash_password, rounds=rounds)
+    if len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(hash_password, passwords))
+
 class UserDatabase:
     """
     Manages user-specific database operations with a shared connection.
     """
-    def __init__(self, conn):
+    def __init__(self, conn, lock=None):
         """
         Initializes the UserDatabase with a shared database connection.
 
         Args:
             conn: An active SQLite database connection
+            lock: Lock shared by all handlers using conn. A private lock is
+                  created if omitted.
         """
         self.logger = logging.getLogger(__name__)
         self.conn = conn
+        self.conn.row_factory = sqlite3.Row
+        self.lock = lock or threading.RLock()
 
+    @with_lock
     def initialize_tables(self):
         """
         Creates user-specific tables if they don't exist.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            email TEXT,
-            name TEXT,
-            hashed_password TEXT
-        )
-        """)
-        self.conn.commit()
+        self.conn.executescript(_SQL_SCHEMA)
         self.logger.info("User tables initialized.")
 
+    @with_lock
     def add_user(self, user_data):
         """
         Adds a new user to the database, hashing the password.
@@ -45,62 +91,58 @@ class UserDatabase:
         try:
             hashed_password = Hasher.hash(user_data['password'])
             
-            cursor.execute("""
-            INSERT INTO users (username, email, name, hashed_password)
-            VALUES (?, ?, ?, ?)
-            """, (user_data['username'], user_data['email'], user_data['name'], hashed_password))
+            # OR IGNORE reports a duplicate username as rowcount 0 instead of
+            # raising IntegrityError
+            cursor.execute(_SQL_INSERT_USER_OR_IGNORE, (user_data['username'], user_data['email'], user_data['name'], hashed_password))
             self.conn.commit()
+            if cursor.rowcount == 0:
+                self.logger.warning(f"Username '{user_data['username']}' already exists.")
+                return False
             self.logger.info(f"Added user: {user_data['username']}")
             return True
-        except sqlite3.IntegrityError:
-            self.logger.warning(f"Username '{user_data['username']}' already exists.")
-            return False
         except sqlite3.Error as e:
             self.logger.error(f"Error adding user {user_data['username']}: {e}")
             return False
 
+    @with_lock
     def get_authenticator_credentials(self):
         """
         Retrieves user credentials in the format required by Streamlit Authenticator.
         """
         cursor = self.conn.cursor()
         try:
-            cursor.execute("SELECT username, email, name, hashed_password FROM users")
-            rows = cursor.fetchall()
-
-            credentials = {'usernames': {}}
-            for row in rows:
-                username, email, name, hashed_password = row
-                credentials['usernames'][username] = {
-                    'email': email,
-                    'name': name,
-                    'password': hashed_password
-                }
-            self.logger.info(f"Retrieved credentials for {len(rows)} users.")
+            cursor.execute(_SQL_SELECT_CREDENTIALS)
+            credentials = {'usernames': {
+                row['username']: {'email': row['email'], 'name': row['name'], 'password': row['password']}
+                for row in cursor
+            }}
+            self.logger.info(f"Retrieved credentials for {len(credentials['usernames'])} users.")
             return credentials
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving user credentials: {e}")
             return {'usernames': {}}
 
+    @with_lock
     def truncate_tables(self):
         """
         Removes all rows from the users table.
         """
         cursor = self.conn.cursor()
         try:
-            cursor.execute("DELETE FROM users")
+            cursor.execute(_SQL_DELETE_USERS)
             self.conn.commit()
             self.logger.info("Truncated users table.")
         except sqlite3.Error as e:
             self.logger.error(f"Error truncating users table: {e}")
             self.conn.rollback()
 
-    def populate_from_json(self, file_path="users.json"):
+    def populate_from_json(self, file_path="users.json", replace=False):
         """
-        Populates the users table from a JSON file.
+        Populates the users table from a JSON file in a single transaction.
 
         Args:
             file_path (str): The path to the JSON file relative to project root.
+            replace (bool): Delete existing users within the same transaction.
         """
         self.logger.info(f"Populating users from JSON file: {file_path}")
         full_path = Path(__file__).parent.parent / file_path
@@ -113,10 +155,23 @@ class UserDatabase:
             with open(full_path, 'r') as f:
                 data = json.load(f)
 
-            count = 0
-            for item in data:
-                if self.add_user(item):
-                    count += 1
+            # Hash outside the lock; only the insert needs the connection.
+            rounds = os.environ.get(SEED_BCRYPT_ROUNDS_ENV)
+            hashes = _hash_passwords(
+                [item['password'] for item in data],
+                rounds=int(rounds) if rounds else None
+            )
+            rows = [
+                (item['username'], item['email'], item['name'], hashed_password)
+                for item, hashed_password in zip(data, hashes)
+            ]
+            with self.lock, self.conn:
+                if replace:
+                    self.conn.execute(_SQL_DELETE_USERS)
+                cursor = self.conn.executemany(_SQL_INSERT_USER_OR_IGNORE, rows)
+            count = cursor.rowcount
+            if count < len(rows):
+                self.logger.warning(f"Skipped {len(rows) - count} users with existing usernames.")
             self.logger.info(f"Successfully populated {count} users.")
         except json.JSONDecodeError:
             self.logger.error(f"Invalid JSON format in {full_path}")
@@ -0,0 +1,102 @@
+# rag/rag_embedding_cache.py
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+import numpy as np
+
+_SQL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chunk_embeddings (
+        chunk_sha TEXT PRIMARY KEY,
+        vector BLOB NOT NULL
+    )
+"""
+_SQL_INSERT_EMBEDDING = "INSERT OR REPLACE INTO chunk_embeddings (chunk_sha, vector) VALUES (?, ?)"
+
+# Keys per SELECT ... IN (...) lookup, kept well under SQLite's bind-variable limit.
+_LOOKUP_BATCH_SIZE = 500
+
+class ChunkEmbeddingCache:
+    """
+    SQLite-backed cache of embedding vectors keyed by a hash of the chunk text
+    and the embedding model, so unchanged chunks skip the embedding API.
+    """
+    def __init__(self, db_path, model_name):
+        """
+        Initializes the cache, creating the database file if needed.
+
+        Args:
+            db_path (Path): Path to the SQLite file holding the vectors.
+            model_name (str): Embedding model name; part of every key so that
+                              switching models never returns stale vectors.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute(_SQL_SCHEMA)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Closes the cache database connection."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _key(self, text):
+        """Returns the cache key for a chunk of text."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(self.model_name.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(text.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get_many(self, texts):
+        """
+        Looks up cached vectors for the given texts.
+
+        Args:
+            texts (list): Chunk texts to look up.
+
+        Returns:
+            dict: Maps each text that was found to its vector (float32 numpy array).
+        """
+        keys = {}
+        for text in texts:
+            keys.setdefault(self._key(text), text)
+        key_list = list(keys)
+
+        found = {}
+        for start in range(0, len(key_list), _LOOKUP_BATCH_SIZE):
+            batch = key_list[start:start + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT chunk_sha, vector FROM chunk_embeddings WHERE chunk_sha IN ({placeholders})",
+                batch
+            )
+            for chunk_sha, vector in rows:
+                found[keys[chunk_sha]] = np.frombuffer(vector, dtype=np.float32)
+        self.logger.info(f"Embedding cache hits: {len(found)} of {len(keys)} unique chunks.")
+        return found
+
+    def put_many(self, text_vectors):
+        """
+        Stores vectors for chunks of text.
+
+        Args:
+            text_vectors (iterable): (text, vector) pairs.
+        """
+        rows = [
+            (self._key(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in text_vectors
+        ]
+        with self.conn:
+            self.conn.executemany(_SQL_INSERT_EMBEDDING, rows)
+        self.logger.info(f"Stored {len(rows)} embeddings in cache.")
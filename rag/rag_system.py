@@ -4,11 +4,24 @@ import streamlit as st
 import google.generativeai as genai
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain.vectorstores import FAISS
+from langchain_core.caches import InMemoryCache
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.chains import ConversationalRetrievalChain
 from langchain.schema import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from semantic_text_splitter import TextSplitter
+from rag.rag_embedding_cache import ChunkEmbeddingCache
 import io
+import faiss
+import numpy as np
+import json
+import pickle
+import hashlib
 import logging
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path # Import Path for easier path manipulation
 
 # Configure logging
@@ -21,7 +34,62 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 KB_DIRECTORY = PROJECT_ROOT / "kb"
 
+# --- On-disk vector store cache ---
+# Each FAISS index is saved in its own folder named after the hash of the documents
+# it was built from, and index.hash points at the current one; when the hash still
+# matches on startup the index is loaded instead of re-embedded.
+INDEX_CACHE_DIRECTORY = KB_DIRECTORY / ".cache"
+FAISS_INDEX_DIR_PREFIX = "faiss_"
+FAISS_INDEX_HASH_PATH = INDEX_CACHE_DIRECTORY / "index.hash"
+# Per-chunk vectors, so a rebuild only embeds chunks that actually changed.
+EMBEDDING_CACHE_PATH = INDEX_CACHE_DIRECTORY / "embeddings.db"
+# Exact-match cache of chat model responses, keyed by the full prompt and model
+# settings. Held in memory for the process only, since prompts carry users' chat
+# history and tasks; the oldest entries are evicted past this size.
+LLM_CACHE_MAX_ENTRIES = 256
+EMBEDDING_MODEL = "models/embedding-001"
+# Chunks per embedding request, and how many requests may be in flight at once.
+# Keep EMBED_CONCURRENCY within the Gemini per-minute request quota.
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 8
+# HNSW graph over L2-normalized vectors, so inner product ranks by cosine similarity.
+# Vectors are stored as 8-bit scalar-quantized codes (a quarter of float32 memory).
+# M is the neighbours per node; efConstruction/efSearch are the candidate list
+# sizes while building and querying. VECTOR_INDEX_TYPE is part of the cache hash.
+VECTOR_INDEX_TYPE = "hnsw-sq8-ip"
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 100
+HNSW_EF_SEARCH = 64
+# Wrapper options used both when building and when loading the saved index.
+VECTOR_STORE_OPTIONS = {"distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT}
+# Concurrent reads when loading the knowledge base directory.
+KB_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Text splitter settings (characters) for knowledge base and uploaded files.
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+
 # --- Helper function for file processing (Focus on Markdown) ---
+def decode_markdown_bytes(data, source):
+    """
+    Decodes Markdown bytes as UTF-8, falling back to latin-1, which maps every
+    byte and so cannot fail. A strict UTF-8 decode stops at the first invalid
+    byte, so non-UTF-8 content is only partially scanned before the fallback.
+
+    Args:
+        data (bytes): Raw file content.
+        source (str): Description of the content for log messages.
+
+    Returns:
+        str: The decoded text.
+    """
+    try:
+        text = data.decode("utf-8")
+        logger.info(f"Successfully decoded {source} with UTF-8.")
+    except UnicodeDecodeError:
+        logger.warning(f"UTF-8 decoding failed for {source}, using latin-1.")
+        text = data.decode("latin-1")
+    return text
+
 # This remains useful if uploads are ever used, but we'll read directly for KB files
 def extract_text_from_md_file(uploaded_file):
     """Extracts text content from an uploaded Markdown file."""
@@ -36,20 +104,7 @@ def extract_text_from_md_file(uploaded_file):
         return None
 
     try:
-        # Attempt common encodings for text files
-        try:
-            text = bytes_data.decode("utf-8")
-            logger.info(f"Successfully decoded uploaded '{file_name}' with UTF-8.")
-        except UnicodeDecodeError:
-            logger.warning(f"UTF-8 decoding failed for uploaded '{file_name}', trying latin-1.")
-            try:
-                text = bytes_data.decode("latin-1") # Try another common encoding
-                logger.info(f"Successfully decoded uploaded '{file_name}' with latin-1.")
-            except Exception as decode_err:
-                st.warning(f"Could not decode uploaded Markdown file '{file_name}' with UTF-8 or latin-1: {decode_err}. Skipping.")
-                logger.error(f"Decoding failed for uploaded {file_name} with multiple encodings: {decode_err}", exc_info=True)
-                return None
-
+        text = decode_markdown_bytes(bytes_data, f"uploaded '{file_name}'")
         return text.strip() if text else None # Return None if extraction yielded empty string
 
     except Exception as e:
@@ -79,11 +134,13 @@ def create_task_documents(data):
             tags_str = ', '.join(tags_str)
 
         # Add a type hint for better context during retrieval
-        page_content = f"Type: Task\n"
-        page_content += f"Title: {task.get('title', 'N/A')}\n"
-        page_content += f"Description: {task.get('description', 'N/A')}\n"
-        page_content += f"Tags: {tags_str}\n" # Use the processed string
-        page_content += f"Timestamp: {task.get('timestamp', 'N/A')}\n\n"
+        page_content = (
+            f"Type: Task\n"
+            f"Title: {task.get('title', 'N/A')}\n"
+            f"Description: {task.get('description', 'N/A')}\n"
+            f"Tags: {tags_str}\n" # Use the processed string
+            f"Timestamp: {task.get('timestamp', 'N/A')}\n\n"
+        )
 
         # Ensure metadata values are simple types (str, int, float, bool)
         # Task ID is crucial for potential future actions
@@ -116,13 +173,8 @@ def create_file_documents(uploaded_files):
 
     logger.info(f"Processing {len(md_files)} uploaded Markdown files.")
 
-    # Configure the text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500, # Experiment with size
-        chunk_overlap=200,  # Overlap helps maintain context between chunks
-        length_function=len,
-        add_start_index=True, # Useful for referencing original position if needed
-    )
+    # Configure the text splitter; overlap helps maintain context between chunks
+    text_splitter = TextSplitter(CHUNK_SIZE, overlap=CHUNK_OVERLAP)
 
     for uploaded_file in md_files:
         file_name = uploaded_file.name
@@ -131,7 +183,7 @@ def create_file_documents(uploaded_files):
 
         if text:
             # Split the extracted text into chunks
-            chunks = text_splitter.split_text(text)
+            chunks = text_splitter.chunks(text)
             num_chunks = len(chunks)
             logger.info(f"Splitting uploaded '{file_name}' into {num_chunks} chunks.")
 
@@ -163,6 +215,40 @@ def create_file_documents(uploaded_files):
     return file_documents, processed_files_info
 
 # --- NEW function for creating documents from the KB directory ---
+def iter_markdown_files(root):
+    """
+    Recursively yields the paths (as strings) of .md files under root.
+    os.scandir reuses the file type from the directory listing, so no Path
+    objects or extra stat calls are made per entry. Symlinked directories are
+    not followed.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_markdown_files(entry.path)
+            elif entry.name.lower().endswith(".md"):
+                yield entry.path
+
+def _read_kb_file(file_path: Path):
+    """
+    Reads a KB file as UTF-8, falling back to latin-1. Runs on a worker thread,
+    so it only logs; Streamlit messages are left to the caller.
+
+    Returns:
+        tuple: (file_path, text, error). text is None if the file could not be read.
+    """
+    file_name = file_path.name
+    logger.info(f"Processing KB file: {file_path}")
+    try:
+        # Read once and decode in memory; a fallback no longer re-reads the file.
+        text = decode_markdown_bytes(file_path.read_bytes(), f"KB file '{file_name}'")
+        # Match read_text's universal newlines so chunk text (and cache keys) are unchanged
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return file_path, text, None
+    except Exception as read_err: # Catch other file reading errors
+        logger.error(f"Error reading KB file {file_name}: {read_err}", exc_info=True)
+        return file_path, None, read_err
+
 def create_documents_from_kb(kb_dir_path: Path):
     """Scans a directory for .md files, reads them, and creates chunked Document objects."""
     kb_documents = []
@@ -175,67 +261,52 @@ def create_documents_from_kb(kb_dir_path: Path):
 
     logger.info(f"Scanning knowledge base directory: {kb_dir_path}")
 
-    # Configure the text splitter (same as for uploads)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=200,
-        length_function=len,
-        add_start_index=True,
-    )
-
-    md_files_found = list(kb_dir_path.rglob("*.md")) # Recursively find all .md files
+    md_files_found = [Path(path) for path in iter_markdown_files(kb_dir_path)] # Recursively find all .md files
     logger.info(f"Found {len(md_files_found)} Markdown files in {kb_dir_path}.")
 
     if not md_files_found:
         return [], []
 
     with st.spinner(f"Processing {len(md_files_found)} files from knowledge base..."):
-        for file_path in md_files_found:
+        # Reads are I/O-bound, so a thread pool overlaps them.
+        with ThreadPoolExecutor(max_workers=min(KB_READ_WORKERS, len(md_files_found))) as executor:
+            file_texts = list(executor.map(_read_kb_file, md_files_found))
+
+        readable_files = []
+        for file_path, text, read_err in file_texts:
+            if read_err is not None:
+                st.error(f"Error reading KB file {file_path.name}: {read_err}")
+                continue # Skip this file
+            if text and text.strip():
+                readable_files.append((file_path, text.strip()))
+            else:
+                logger.warning(f"No content extracted or empty content in KB file {file_path.name}, skipping.")
+
+        # One splitter is reused for every file
+        text_splitter = TextSplitter(CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+
+        for file_path, text in readable_files:
             file_name = file_path.name
-            logger.info(f"Processing KB file: {file_path}")
-            text = None
             try:
-                # Try reading with UTF-8 first, then latin-1 as fallback
-                try:
-                    text = file_path.read_text(encoding="utf-8")
-                    logger.info(f"Successfully read KB file '{file_name}' with UTF-8.")
-                except UnicodeDecodeError:
-                    logger.warning(f"UTF-8 decoding failed for KB file '{file_name}', trying latin-1.")
-                    try:
-                        text = file_path.read_text(encoding="latin-1")
-                        logger.info(f"Successfully read KB file '{file_name}' with latin-1.")
-                    except Exception as decode_err:
-                        st.warning(f"Could not decode KB file '{file_name}' with UTF-8 or latin-1: {decode_err}. Skipping.")
-                        logger.error(f"Decoding failed for KB file {file_name} with multiple encodings: {decode_err}", exc_info=True)
-                        continue # Skip this file
-                except Exception as read_err: # Catch other file reading errors
-                     st.error(f"Error reading KB file {file_name}: {read_err}")
-                     logger.error(f"Error reading KB file {file_name}: {read_err}", exc_info=True)
-                     continue # Skip this file
-
-                if text and text.strip():
-                    text = text.strip()
-                    chunks = text_splitter.split_text(text)
-                    num_chunks = len(chunks)
-                    logger.info(f"Splitting KB file '{file_name}' into {num_chunks} chunks.")
-
-                    for i, chunk in enumerate(chunks):
-                        page_content = f"Type: Knowledge Base File\nSource File: {file_name}\n\n{chunk}"
-                        metadata = {
-                            "source_type": "kb_file",
-                            "filename": file_name,
-                            "full_path": str(file_path), # Store full path for reference
-                            "chunk_index": i,
-                        }
-                        metadata = {k: v for k, v in metadata.items() if v is not None}
-                        doc = Document(page_content=page_content, metadata=metadata)
-                        kb_documents.append(doc)
-
-                    # Store info about the processed file
-                    processed_kb_files_info.append({"name": file_name, "chunks": num_chunks})
-                    logger.info(f"Successfully created {num_chunks} document chunks for KB file {file_name}")
-                else:
-                    logger.warning(f"No content extracted or empty content in KB file {file_name}, skipping.")
+                chunks = text_splitter.chunks(text)
+                num_chunks = len(chunks)
+                logger.info(f"Splitting KB file '{file_name}' into {num_chunks} chunks.")
+
+                for i, chunk in enumerate(chunks):
+                    page_content = f"Type: Knowledge Base File\nSource File: {file_name}\n\n{chunk}"
+                    metadata = {
+                        "source_type": "kb_file",
+                        "filename": file_name,
+                        "full_path": str(file_path), # Store full path for reference
+                        "chunk_index": i,
+                    }
+                    metadata = {k: v for k, v in metadata.items() if v is not None}
+                    doc = Document(page_content=page_content, metadata=metadata)
+                    kb_documents.append(doc)
+
+                # Store info about the processed file
+                processed_kb_files_info.append({"name": file_name, "chunks": num_chunks})
+                logger.info(f"Successfully created {num_chunks} document chunks for KB file {file_name}")
 
             except Exception as e:
                 st.error(f"Unexpected error processing KB file {file_name}: {e}")
@@ -246,6 +317,267 @@ def create_documents_from_kb(kb_dir_path: Path):
     return kb_documents, processed_kb_files_info
 
 
+def kb_fingerprint(kb_dir_path: Path):
+    """Returns a sorted tuple of (path, mtime_ns, size) for every Markdown file in the KB."""
+    if not kb_dir_path.is_dir():
+        return ()
+    fingerprint = []
+    for path in iter_markdown_files(kb_dir_path):
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(fingerprint))
+
+# (fingerprint, (kb_documents, processed_kb_files_info)) from the last KB scan
+_kb_documents_cache = (None, None)
+
+def get_kb_documents(kb_dir_path: Path):
+    """
+    Returns create_documents_from_kb(kb_dir_path), reusing the previous result
+    while no Markdown file was added, removed or modified. Chain rebuilds after
+    a task edit then skip re-reading and re-chunking the whole knowledge base.
+    """
+    global _kb_documents_cache
+    fingerprint = kb_fingerprint(kb_dir_path)
+    cached_fingerprint, cached_result = _kb_documents_cache
+    if cached_fingerprint == fingerprint:
+        logger.info(f"Knowledge base unchanged; reusing {len(cached_result[0])} documents.")
+        return cached_result
+    result = create_documents_from_kb(kb_dir_path)
+    _kb_documents_cache = (fingerprint, result)
+    return result
+
+# --- Persistent FAISS index cache ---
+def compute_documents_hash(documents):
+    """
+    Computes a content hash over all documents (page content and metadata)
+    plus the embedding model name and index type. Document order does not
+    affect the hash.
+    """
+    hasher = hashlib.sha256(f"{EMBEDDING_MODEL}\0{VECTOR_INDEX_TYPE}".encode("utf-8"))
+    for content, metadata in sorted(
+        (doc.page_content, json.dumps(doc.metadata, sort_keys=True, default=str)) for doc in documents
+    ):
+        hasher.update(content.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(metadata.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+# Serializes index saves within the process, so the pointer and folders of two
+# concurrent saves cannot interleave.
+_INDEX_SAVE_LOCK = threading.Lock()
+
+# Memory-map the quantized vector codes where the installed faiss supports it
+# (IO_FLAG_MMAP_IFC is missing from older faiss-cpu builds).
+FAISS_READ_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+def faiss_index_path(documents_hash):
+    """Returns the folder the FAISS index built from documents_hash is saved in."""
+    return INDEX_CACHE_DIRECTORY / f"{FAISS_INDEX_DIR_PREFIX}{documents_hash}"
+
+def load_cached_vector_store(documents_hash, embeddings):
+    """
+    Loads the saved FAISS index if it was built from the same documents.
+
+    Returns:
+        FAISS or None: The cached vector store, or None on a miss or load error.
+    """
+    try:
+        if not FAISS_INDEX_HASH_PATH.exists() or FAISS_INDEX_HASH_PATH.read_text().strip() != documents_hash:
+            logger.info("No cached FAISS index for the current documents.")
+            return None
+        index_path = faiss_index_path(documents_hash)
+        # Read the files written by save_local directly: FAISS.load_local only accepts
+        # faiss read flags in releases that need langchain 1.x. The vector codes (the
+        # bulk of the file) are memory-mapped read-only where supported, so their pages
+        # load on first access; the HNSW graph is still read into memory. The loaded
+        # index is never modified, and a saved folder is never rewritten, so the mapped
+        # file cannot change underneath it.
+        index = faiss.read_index(str(index_path / "index.faiss"), FAISS_READ_FLAGS)
+        # The pickle is written only by save_vector_store_cache below.
+        with open(index_path / "index.pkl", "rb") as pickle_file:
+            docstore, index_to_docstore_id = pickle.load(pickle_file)
+        vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id, **VECTOR_STORE_OPTIONS)
+        logger.info(f"Loaded cached FAISS index from {index_path}.")
+        return vector_store
+    except Exception as e:
+        logger.warning(f"Failed to load cached FAISS index, rebuilding: {e}", exc_info=True)
+        return None
+
+def save_vector_store_cache(vector_store, documents_hash):
+    """
+    Saves the FAISS index to the folder for documents_hash, then points
+    index.hash at it. Folders of earlier indexes are removed where possible.
+    """
+    index_path = faiss_index_path(documents_hash)
+    try:
+        with _INDEX_SAVE_LOCK:
+            INDEX_CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+            if not index_path.is_dir():
+                # Save to a staging folder and rename it into place, so a partially
+                # written index is never visible under its final name.
+                staging_dir = tempfile.mkdtemp(prefix=".staging_", dir=INDEX_CACHE_DIRECTORY)
+                try:
+                    vector_store.save_local(staging_dir)
+                    os.replace(staging_dir, index_path)
+                except Exception:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                    raise
+            # Switch the pointer atomically; it is only written once its folder is complete
+            with tempfile.NamedTemporaryFile("w", dir=INDEX_CACHE_DIRECTORY, prefix=".staging_", delete=False) as pointer_file:
+                pointer_file.write(documents_hash)
+            os.replace(pointer_file.name, FAISS_INDEX_HASH_PATH)
+            logger.info(f"Saved FAISS index cache to {index_path}.")
+            # Best effort: an index still memory-mapped by a loaded store cannot be
+            # deleted on Windows, and is left for a later save to remove.
+            for stale_path in INDEX_CACHE_DIRECTORY.glob(f"{FAISS_INDEX_DIR_PREFIX}*"):
+                if stale_path != index_path and stale_path.is_dir():
+                    shutil.rmtree(stale_path, ignore_errors=True)
+    except Exception as e:
+        logger.warning(f"Failed to save FAISS index cache: {e}", exc_info=True)
+
+def batch_embed(texts, embeddings, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY):
+    """
+    Embeds texts in fixed-size batches, sending up to `concurrency` requests
+    at a time. The calls are network-bound, so threads overlap their latency.
+
+    Args:
+        texts (list): Texts to embed.
+        embeddings (Embeddings): Embedding model.
+        batch_size (int): Texts per embedding request.
+        concurrency (int): Maximum number of requests in flight.
+
+    Returns:
+        list: One vector per text, in input order.
+    """
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    if len(batches) < 2:
+        return [vector for batch in batches for vector in embeddings.embed_documents(batch)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(embeddings.embed_documents, batches)
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+def create_hnsw_index(matrix):
+    """
+    Creates an empty inner-product HNSW index with 8-bit scalar quantization.
+    The quantizer is trained on matrix (the per-dimension value ranges), but
+    the vectors themselves are not added.
+    """
+    index = faiss.IndexHNSWSQ(matrix.shape[1], faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    index.train(matrix)
+    return index
+
+def iter_embedding_batches(documents, embeddings, cache, batch_size=EMBED_BATCH_SIZE * EMBED_CONCURRENCY):
+    """
+    Yields documents with their unit-length vectors one batch at a time, so only
+    a batch of float vectors is held in memory while the index is built.
+
+    Identical chunks within a batch are embedded once; repeats in later batches
+    are served by the cache, which is updated before the batch is yielded.
+
+    Args:
+        documents (list): LangChain Document objects to embed.
+        embeddings (Embeddings): Embedding model used for cache misses.
+        cache (ChunkEmbeddingCache): Open per-chunk embedding cache.
+        batch_size (int): Documents per batch; the default keeps every
+                          concurrent embedding request full.
+
+    Yields:
+        tuple: (texts, metadatas, float32 matrix of L2-normalized vectors).
+    """
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        texts = [doc.page_content for doc in batch]
+        vectors = cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if missing:
+            logger.info(f"Embedding {len(missing)} new or changed unique chunks.")
+            new_vectors = batch_embed(missing, embeddings)
+            cache.put_many(zip(missing, new_vectors))
+            vectors.update(zip(missing, new_vectors))
+
+        matrix = np.array([vectors[text] for text in texts], dtype=np.float32)
+        # Unit-length document vectors make inner product rank results by cosine
+        # similarity; the query's own length scales all scores equally.
+        faiss.normalize_L2(matrix)
+        yield texts, [doc.metadata for doc in batch], matrix
+
+def build_vector_store(documents, embeddings):
+    """
+    Builds a FAISS vector store, embedding each distinct chunk text at most
+    once and only if it is missing from the per-chunk embedding cache.
+    Vectors are added to the index batch by batch; the quantizer is trained
+    on the first batch.
+
+    Args:
+        documents (list): LangChain Document objects to index.
+        embeddings (Embeddings): Embedding model used for cache misses and queries.
+
+    Returns:
+        FAISS: The vector store.
+    """
+    vector_store = None
+    with ChunkEmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_MODEL) as cache:
+        for texts, metadatas, matrix in iter_embedding_batches(documents, embeddings, cache):
+            if vector_store is None:
+                vector_store = FAISS(
+                    embedding_function=embeddings,
+                    index=create_hnsw_index(matrix),
+                    docstore=InMemoryDocstore(),
+                    index_to_docstore_id={},
+                    **VECTOR_STORE_OPTIONS,
+                )
+            vector_store.add_embeddings(zip(texts, matrix), metadatas=metadatas)
+    return vector_store
+
+# --- Process-wide resources shared by all sessions and reruns ---
+@st.cache_resource(show_spinner=False)
+def configure_genai(api_key):
+    """Configures the Google GenAI client once per process (and per API key)."""
+    genai.configure(api_key=api_key)
+    logger.info("Google GenAI configured.")
+
+@st.cache_resource(show_spinner=False)
+def get_embeddings():
+    """Returns the shared embedding model client."""
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+@st.cache_resource(show_spinner=False)
+def get_llm(model_name):
+    """
+    Returns the shared chat model client for model_name. Responses are cached
+    in memory by exact prompt, so a repeated question over the same retrieved
+    context and history is answered without a Gemini call.
+    """
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        temperature=0.3,
+        convert_system_message_to_human=True,
+        cache=InMemoryCache(maxsize=LLM_CACHE_MAX_ENTRIES),
+    )
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_vector_store(documents_hash, _documents):
+    """
+    Returns the vector store for the given documents, memoized on their hash so
+    sessions and chain rebuilds over unchanged documents share one store. Only
+    the latest store is kept, since every session sees the same tasks and KB.
+
+    On a miss the store is loaded from the on-disk index cache, or built and saved.
+    _documents is not hashed by Streamlit; documents_hash identifies it.
+    """
+    embeddings = get_embeddings()
+    vector_store = load_cached_vector_store(documents_hash, embeddings)
+    if vector_store is None:
+        with st.spinner(f"Creating embeddings and vector store from {len(_documents)} documents... (can take a moment)"):
+            logger.info(f"Creating vector store from {len(_documents)} total documents.")
+            vector_store = build_vector_store(_documents, embeddings)
+            logger.info("FAISS vector store created successfully.")
+        save_vector_store_cache(vector_store, documents_hash)
+    return vector_store
+
 # --- Modified initialize_rag_system ---
 def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_files param for potential future use
     """
@@ -272,8 +604,7 @@ def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_file
         logger.warning("Google API key not found in environment variables.")
         return None, [], []
     try:
-        genai.configure(api_key=api_key)
-        logger.info("Google GenAI configured.")
+        configure_genai(api_key)
     except Exception as e:
         st.error(f"Failed to configure Google GenAI: {e}")
         logger.error(f"Google GenAI configuration failed: {e}", exc_info=True)
@@ -302,7 +633,7 @@ def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_file
     # 2. Load and process files from the Knowledge Base directory
     try:
         logger.info(f"Attempting to load files from KB directory: {KB_DIRECTORY}")
-        kb_documents, kb_processed_info = create_documents_from_kb(KB_DIRECTORY)
+        kb_documents, kb_processed_info = get_kb_documents(KB_DIRECTORY)
         if kb_documents:
             all_documents.extend(kb_documents)
             processed_files_info.extend(kb_processed_info) # Add KB file info
@@ -310,7 +641,7 @@ def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_file
         else:
             logger.info("No documents generated from the KB directory.")
             # Optionally inform user if KB dir was expected but empty/missing
-            if KB_DIRECTORY.exists() and not any(KB_DIRECTORY.rglob("*.md")):
+            if KB_DIRECTORY.exists() and not any(iter_markdown_files(KB_DIRECTORY)):
                  st.info(f"Knowledge base directory '{KB_DIRECTORY.name}' is empty or contains no Markdown files.")
             elif not KB_DIRECTORY.exists():
                  st.info(f"Knowledge base directory '{KB_DIRECTORY.name}' not found.")
@@ -350,14 +681,10 @@ def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_file
         logger.warning("No documents available to build vector store. RAG system will be inactive.")
         return None, task_data, [] # Return empty list for processed_files_info
 
-    # 4. Create embeddings and vector store
+    # 4. Create embeddings and vector store (reusing the cached index if documents are unchanged)
     vector_store = None
     try:
-        with st.spinner(f"Creating embeddings and vector store from {len(all_documents)} documents... (can take a moment)"):
-            logger.info(f"Creating vector store from {len(all_documents)} total documents.")
-            embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-            vector_store = FAISS.from_documents(all_documents, embeddings)
-            logger.info("FAISS vector store created successfully.")
+        vector_store = get_vector_store(compute_documents_hash(all_documents), all_documents)
     except Exception as e:
         st.error(f"Failed to create vector store: {e}")
         logger.error(f"FAISS vector store creation failed: {e}", exc_info=True)
@@ -367,7 +694,7 @@ def initialize_rag_system(db, memory, uploaded_files=None): # Keep uploaded_file
     llm = None
     try:
         model_name = "gemini-1.5-flash"
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.3, convert_system_message_to_human=True)
+        llm = get_llm(model_name)
         logger.info(f"Initialized LLM with model: {model_name}")
     except Exception as e:
         st.error(f"Failed to initialize the Language Model (Model: {model_name}): {e}")
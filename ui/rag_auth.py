@@ -14,9 +14,10 @@ def authenticate_login():
 
     try:
         # Create UserDatabase instance to fetch credentials
-        conn = BaseDatabase().connect()
-        user_db = UserDatabase(conn)
-        credentials = user_db.get_authenticator_credentials()
+        # Credentials are only read here, so use a read-only connection
+        with BaseDatabase(read_only=True) as base_db:
+            user_db = UserDatabase(base_db.get_connection(), base_db.lock)
+            credentials = user_db.get_authenticator_credentials()
 
         # Check if credentials could be fetched
         if not credentials or 'usernames' not in credentials:
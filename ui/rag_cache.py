@@ -15,6 +15,7 @@ class CacheService:
             st.session_state.task_cache = {
                 'version': 0,
                 'tasks': {},
+                'tasks_by_tag': {},
                 'loaded': False
             }
     
@@ -28,6 +29,12 @@ class CacheService:
 
             tasks = self.db.get_all_tasks()
             st.session_state.task_cache['tasks'] = {t['id']: t for t in tasks}
+            # Tag -> tasks index, so filtering doesn't re-split every task's tags per rerun
+            tasks_by_tag = {}
+            for t in tasks:
+                for tag in dict.fromkeys(t['tags'].split(',')):
+                    tasks_by_tag.setdefault(tag, []).append(t)
+            st.session_state.task_cache['tasks_by_tag'] = tasks_by_tag
             st.session_state.task_cache['version'] = current_cache_version
             st.session_state.task_cache['loaded'] = True
             self.logger.info("Task cache successfully loaded and updated.")
@@ -37,8 +44,12 @@ class CacheService:
         self.load_cache()
         if not filter_tag or filter_tag == 'All':
             return list(st.session_state.task_cache['tasks'].values())
-        return [t for t in st.session_state.task_cache['tasks'].values()
-                if filter_tag in t['tags'].split(',')]
+        return list(st.session_state.task_cache['tasks_by_tag'].get(filter_tag, []))
+
+    def get_tags(self):
+        """Get the distinct tags of all cached tasks"""
+        self.load_cache()
+        return st.session_state.task_cache['tasks_by_tag'].keys()
     
     def invalidate_cache(self):
         """Mark cache as stale"""
@@ -17,6 +17,24 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def refresh_chain(chain_initialize_func):
+    """
+    Rebuild the RAG chain and swap it into the session once it is complete.
+
+    The current chain keeps answering until the new one is ready, and stays in
+    place if the rebuild fails.
+
+    Args:
+    chain_initialize_func (callable): A function to reinitialize the RAG system.
+    """
+    chain, task_data, processed_files_info = chain_initialize_func()
+    if chain is None:
+        logger.warning("RAG chain rebuild failed; keeping the previous chain.")
+        return
+    st.session_state.chain = chain
+    st.session_state.task_data = task_data
+    st.session_state.kb_files_info = processed_files_info
+
 def add_new_task(db, title, description, tags_string, chain_initialize_func):
     """
     Add a new task to the database and reinitialize the RAG system.
@@ -43,7 +61,7 @@ def add_new_task(db, title, description, tags_string, chain_initialize_func):
     db.add_task(new_task)
 
     # Reinitialize the RAG system with updated data
-    st.session_state.chain, _ = chain_initialize_func()
+    refresh_chain(chain_initialize_func)
     return True
 
 def update_task(db, task_id, title, description, tags_string, chain_initialize_func):
@@ -75,7 +93,7 @@ def update_task(db, task_id, title, description, tags_string, chain_initialize_f
     logger.info("Task with ID %s updated: %s.", task_id, updated)
 
     # Reinitialize the RAG system with updated data
-    st.session_state.chain, _ = chain_initialize_func()
+    refresh_chain(chain_initialize_func)
     return True
 
 def task_management(db, chain_initialize_func):
@@ -112,15 +130,9 @@ def task_management(db, chain_initialize_func):
     # Use cache
     cache = CacheService(db)
 
-    # Extract unique tags from db
-    all_tags = set()
-    tasks = cache.get_tasks()
-    for task in tasks:
-        all_tags.update(task['tags'].split(','))
-
-    # Filter options
+    # Filter options from the unique tags in the cache
     filter_options = ["All"]
-    filter_options.extend(sorted(all_tags))
+    filter_options.extend(sorted(cache.get_tags()))
 
     selected_filter = st.selectbox("Filter by tag:", filter_options)
 
@@ -248,12 +260,13 @@ def is_debounced():
     Prevent rapid successive actions by checking time since last action.
     Returns True if action should be ignored, False otherwise.
     """
+    now = datetime.now()
     if 'last_action_time' not in st.session_state:
-        st.session_state.last_action_time = datetime.now()
+        st.session_state.last_action_time = now
         return False
         
-    if (datetime.now() - st.session_state.last_action_time).total_seconds() < 1:
+    if (now - st.session_state.last_action_time).total_seconds() < 1:
         return True
     
-    st.session_state.last_action_time = datetime.now()
+    st.session_state.last_action_time = now
     return False
\ No newline at end of file
@@ -52,12 +52,14 @@ def run_app():
 
 
     # Get task database instance
-    task_db = TaskDatabase(db_helper.conn)
+    task_db = TaskDatabase(db_helper.conn, db_helper.lock)
 
-    # Initialize Cache Service
-    if 'cache_service' not in st.session_state:
-        st.session_state.cache_service = CacheService(task_db)
-        st.session_state.cache_service.reset_cache_version()
+    # Reset the task cache once per session. The CacheService itself is not
+    # kept in session_state: it holds this run's connection, which is closed
+    # once the run's DatabaseHelper is dropped.
+    if 'cache_version_reset' not in st.session_state:
+        CacheService(task_db).reset_cache_version()
+        st.session_state.cache_version_reset = True
 
     # Add sidebar navigation
     view_choice = st.sidebar.radio(
@@ -124,7 +126,7 @@ def initialize_session_state():
         st.session_state.task_cache = {
             'version': 0,
             'tasks': {},
-            'tags': set(),
+            'tasks_by_tag': {},
             'loaded': False
         }
 